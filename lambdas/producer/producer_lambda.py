@@ -9,12 +9,12 @@ import boto3
 import pika
 import httpx
 import redis
-import redis.exceptions
 from pika.exceptions import AMQPConnectionError, UnroutableError
 from rdflib import Graph
 from tqdm import tqdm
 import xmltodict
 
+from hml_reader.dedup import HMLDeduplicator, RedisBloomStore, S3BloomStore
 from hml_reader.schemas.weather import HML
 from hml_reader.settings import Settings
 
@@ -38,6 +38,23 @@ def get_rabbitmq_creds() -> tuple[str, str, str]:
 def get_settings():
     return Settings()
 
+
+def get_deduplicator(settings: Settings) -> HMLDeduplicator:
+    """Builds the Bloom filter + Redis dedup tier, persisting the filter to S3 when configured."""
+    redis_kwargs = dict(
+        host=settings.redis_url,
+        port=settings.redis_port,
+        socket_connect_timeout=settings.redis_socket_timeout,
+        socket_timeout=settings.redis_socket_timeout,
+    )
+    r = redis.Redis(**redis_kwargs, decode_responses=True)
+    if settings.dedup_s3_bucket:
+        store = S3BloomStore(bucket=settings.dedup_s3_bucket, key=settings.dedup_s3_key)
+    else:
+        # The filter blob is binary so it needs a client that does not decode responses
+        store = RedisBloomStore(client=redis.Redis(**redis_kwargs), key=settings.dedup_redis_key)
+    return HMLDeduplicator(settings=settings, redis_client=r, store=store)
+
 def fetch_weather_products() -> list[Any]:
     url = "https://api.weather.gov/products"
     headers = {
@@ -129,20 +146,17 @@ def lambda_handler(event, context):
         raise RuntimeError("Cannot connect to RabbitMQ service") from e
     print("Successfully connected to RabbitMQ")
     hml_data = fetch_weather_products()
-    try:
-        r = redis.Redis(
-            host=settings.redis_url,
-            port=settings.redis_port,
-            decode_responses=True
-        )
-        hml_data = sorted(hml_data, key=lambda x: datetime.fromisoformat(x["issuanceTime"]))
-        for hml in tqdm(hml_data, desc="reading through api.weather.gov HML outputs"):
-            hml_id = hml["id"]
-            if r.get(hml_id) is None:
-                hml_obj = HML(**hml)
-                publish(channel, hml_obj, settings)
-                r.set(hml_id, hml_obj.model_dump_json())
-                r.expire(hml_id, 604800)  # exires after a week
-    except redis.exceptions.ConnectionError as e:
-        raise e("Cannot run Redis service") 
+    dedup = get_deduplicator(settings)
+    dedup.load()
+    hml_data = sorted(hml_data, key=lambda x: datetime.fromisoformat(x["issuanceTime"]))
+    for hml in tqdm(hml_data, desc="reading through api.weather.gov HML outputs"):
+        hml_id = hml["id"]
+        if not dedup.is_duplicate(hml_id):
+            hml_obj = HML(**hml)
+            publish(channel, hml_obj, settings)
+            dedup.mark_seen(hml_id, hml_obj.model_dump_json())
+    # Only a run that got through every product may leave a filter for the next run to trust
+    dedup.save()
+    if not dedup.redis_available:
+        print("Redis was unreachable, probable duplicates were skipped using the local dedup filter")
     return {"status": "ok"}
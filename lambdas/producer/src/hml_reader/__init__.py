@@ -1,5 +1,6 @@
 from hml_reader.client import async_get, get
+from hml_reader.dedup import HMLDeduplicator, RotatingBloomFilter
 from hml_reader.schemas.weather import HML
 from hml_reader.settings import Settings
 
-__all__ = ["async_get", "get", "HML", "Settings"]
+__all__ = ["async_get", "get", "HML", "HMLDeduplicator", "RotatingBloomFilter", "Settings"]
@@ -0,0 +1,337 @@
+import hashlib
+import json
+import math
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+import boto3
+import redis
+import redis.exceptions
+
+from hml_reader.settings import Settings
+
+# Blob layout: magic, version, bucket_seconds, num_bits, num_hashes, bucket count,
+# followed by (bucket_start, bits) for every live bucket. The whole blob is zlib compressed.
+_MAGIC = b"HMLB"
+_VERSION = 1
+_HEADER = struct.Struct(">4sBQQBH")
+_BUCKET_HEADER = struct.Struct(">Q")
+# The persisted blob is the filter's blob prefixed with its length, followed by the zlib
+# compressed JSON of the ids published while Redis was unavailable.
+_ENVELOPE = struct.Struct(">I")
+
+
+class RotatingBloomFilter:
+    """A time-bucketed Bloom filter that forgets ids after a TTL.
+
+    Each bucket is a plain Bloom filter covering ``bucket_seconds`` of inserts. A lookup is the
+    union of all live buckets and buckets older than ``ttl_seconds`` are dropped, which emulates
+    the per-key expiry previously provided by Redis.
+
+    Parameters
+    ----------
+    ttl_seconds : int
+        How long an id is remembered for.
+
+    bucket_seconds : int
+        The width of a single time bucket.
+
+    capacity : int
+        The expected number of ids inserted into a single bucket.
+
+    error_rate : float
+        The target false positive rate of a single bucket at ``capacity``.
+    """
+
+    def __init__(
+        self, ttl_seconds: int, bucket_seconds: int, capacity: int, error_rate: float,
+    ) -> None:
+        if bucket_seconds <= 0 or ttl_seconds < bucket_seconds:
+            raise ValueError("ttl_seconds must be at least one bucket_seconds wide")
+        if capacity <= 0 or not 0.0 < error_rate < 1.0:
+            raise ValueError("capacity must be positive and error_rate must be in (0, 1)")
+
+        self.ttl_seconds = ttl_seconds
+        self.bucket_seconds = bucket_seconds
+        num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.num_bits = (num_bits + 7) // 8 * 8
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.buckets: Dict[int, bytearray] = {}
+
+    def _bucket_start(self, now: float) -> int:
+        return int(now) // self.bucket_seconds * self.bucket_seconds
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def rotate(self, now: Optional[float] = None) -> None:
+        """Drops every bucket that has fully aged past the TTL."""
+        now = time.time() if now is None else now
+        oldest = self._bucket_start(now - self.ttl_seconds)
+        for start in [start for start in self.buckets if start < oldest]:
+            del self.buckets[start]
+
+    def add(self, key: str, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        bits = self.buckets.setdefault(self._bucket_start(now), bytearray(self.num_bits // 8))
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        positions = self._positions(key)
+        return any(
+            all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+            for bits in self.buckets.values()
+        )
+
+    def to_bytes(self) -> bytes:
+        """Serializes every live bucket into a single compressed blob."""
+        parts = [
+            _HEADER.pack(
+                _MAGIC, _VERSION, self.bucket_seconds, self.num_bits, self.num_hashes, len(self.buckets),
+            )
+        ]
+        for start, bits in sorted(self.buckets.items()):
+            parts.append(_BUCKET_HEADER.pack(start))
+            parts.append(bytes(bits))
+        return zlib.compress(b"".join(parts))
+
+    def _parse(self, blob: bytes) -> Optional[Dict[int, bytearray]]:
+        try:
+            data = zlib.decompress(blob)
+            magic, version, bucket_seconds, num_bits, num_hashes, count = _HEADER.unpack_from(data)
+        except (zlib.error, struct.error):
+            return None
+        if (magic, version, bucket_seconds, num_bits, num_hashes) != (
+            _MAGIC, _VERSION, self.bucket_seconds, self.num_bits, self.num_hashes,
+        ):
+            return None
+
+        width = self.num_bits // 8
+        offset = _HEADER.size
+        if len(data) != offset + count * (_BUCKET_HEADER.size + width):
+            return None
+        buckets = {}
+        for _ in range(count):
+            (start,) = _BUCKET_HEADER.unpack_from(data, offset)
+            offset += _BUCKET_HEADER.size
+            buckets[start] = bytearray(data[offset:offset + width])
+            offset += width
+        return buckets
+
+    def load_bytes(self, blob: bytes) -> bool:
+        """Replaces the buckets with those from a blob written by ``to_bytes``.
+
+        Returns
+        -------
+        bool
+            False if the blob is corrupt or was written with a different geometry, in which
+            case the filter is left untouched.
+        """
+        buckets = self._parse(blob)
+        if buckets is None:
+            return False
+        self.buckets = buckets
+        return True
+
+    def merge_bytes(self, blob: bytes) -> bool:
+        """ORs the buckets from a blob written by ``to_bytes`` into this filter.
+
+        Returns
+        -------
+        bool
+            False if the blob is corrupt or was written with a different geometry, in which
+            case the filter is left untouched.
+        """
+        buckets = self._parse(blob)
+        if buckets is None:
+            return False
+        for start, other in buckets.items():
+            bits = self.buckets.setdefault(start, bytearray(len(other)))
+            for i, byte in enumerate(other):
+                bits[i] |= byte
+        return True
+
+
+@dataclass
+class S3BloomStore:
+    """Persists the Bloom filter blob as a single S3 object."""
+    bucket: str
+    key: str
+    client: object = None
+
+    def __post_init__(self):
+        if self.client is None:
+            self.client = boto3.client("s3")
+
+    def load(self) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def save(self, blob: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self.key, Body=blob)
+
+    def delete(self) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.key)
+
+
+@dataclass
+class RedisBloomStore:
+    """Persists the Bloom filter blob as a single Redis key."""
+    client: redis.Redis
+    key: str
+
+    def load(self) -> Optional[bytes]:
+        return self.client.get(self.key)
+
+    def save(self, blob: bytes) -> None:
+        self.client.set(self.key, blob)
+
+    def delete(self) -> None:
+        self.client.delete(self.key)
+
+
+@dataclass
+class HMLDeduplicator:
+    """Layered duplicate detection for HML product ids.
+
+    The Bloom filter answers "definitely new" locally. Only probable duplicates are confirmed
+    against Redis, and if Redis is unreachable the probable duplicates are skipped so a run can
+    still publish everything that is definitely new. Until a persisted filter has been loaded
+    every id is confirmed against Redis, so a cold filter never republishes old products; a cold
+    filter without Redis has nothing to dedup against and raises instead.
+
+    A trusted filter must include every id that has been published, so the persisted filter is
+    deleted as soon as it is loaded and only written back by ``save`` once a run has finished.
+    A run that fails or cannot persist its filter leaves nothing behind and the next run starts
+    cold instead of trusting a filter that is missing its publishes.
+
+    Ids published while Redis is unavailable are kept in ``pending`` and persisted with the
+    filter. They count as duplicates without asking Redis and are written back to Redis by the
+    next run that can reach it.
+    """
+    settings: Settings
+    redis_client: Union[redis.Redis, None] = None
+    store: Union[S3BloomStore, RedisBloomStore, None] = None
+    bloom: RotatingBloomFilter = field(init=False)
+    trusted: bool = False
+    redis_available: bool = True
+    pending: Dict[str, List] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.bloom = RotatingBloomFilter(
+            ttl_seconds=self.settings.dedup_ttl_seconds,
+            bucket_seconds=self.settings.dedup_bucket_seconds,
+            capacity=self.settings.dedup_capacity,
+            error_rate=self.settings.dedup_error_rate,
+        )
+
+    def _encode(self) -> bytes:
+        filter_blob = self.bloom.to_bytes()
+        return _ENVELOPE.pack(len(filter_blob)) + filter_blob + zlib.compress(json.dumps(self.pending).encode())
+
+    def _decode(self, blob: bytes) -> Optional[Tuple[bytes, Dict[str, List]]]:
+        try:
+            (length,) = _ENVELOPE.unpack_from(blob)
+            end = _ENVELOPE.size + length
+            pending = json.loads(zlib.decompress(blob[end:]))
+        except (struct.error, zlib.error, ValueError):
+            return None
+        return blob[_ENVELOPE.size:end], pending
+
+    def _expire_pending(self) -> None:
+        oldest = time.time() - self.settings.dedup_ttl_seconds
+        self.pending = {hml_id: entry for hml_id, entry in self.pending.items() if entry[0] > oldest}
+
+    def _flush_pending(self) -> None:
+        """Writes ids published during a Redis outage back to Redis with their remaining TTL."""
+        self._expire_pending()
+        for hml_id, (marked_at, value) in list(self.pending.items()):
+            remaining = max(1, int(marked_at + self.settings.dedup_ttl_seconds - time.time()))
+            if self._redis_call("set", hml_id, value, ex=remaining) is None:
+                return
+            del self.pending[hml_id]
+
+    def load(self) -> None:
+        """Loads and invalidates the persisted filter, leaving it cold if it is missing or unreadable."""
+        if self.store is None:
+            return
+        try:
+            blob = self.store.load()
+        except Exception as e:
+            print(f"Could not load dedup filter: {e}")
+            return
+        decoded = None if blob is None else self._decode(blob)
+        if decoded is None or not self.bloom.load_bytes(decoded[0]):
+            return
+        self.pending = decoded[1]
+        self._flush_pending()
+        try:
+            self.store.delete()
+        except Exception as e:
+            # A filter that cannot be invalidated could outlive a failed run, so it is not trusted
+            print(f"Could not invalidate dedup filter, confirming every id against Redis: {e}")
+            return
+        self.trusted = True
+        self.bloom.rotate()
+
+    def save(self) -> None:
+        """Persists the filter once a run has finished.
+
+        Any filter another invocation saved since ``load`` is merged in first. If the write
+        fails the persisted filter is deleted so the next run starts cold.
+        """
+        if self.store is None:
+            return
+        self.bloom.rotate()
+        try:
+            blob = self.store.load()
+            decoded = None if blob is None else self._decode(blob)
+            if decoded is not None and self.bloom.merge_bytes(decoded[0]):
+                self.pending = {**decoded[1], **self.pending}
+            self._expire_pending()
+            self.store.save(self._encode())
+        except Exception as e:
+            print(f"Could not persist dedup filter: {e}")
+            try:
+                self.store.delete()
+            except Exception as e:
+                print(f"Could not invalidate dedup filter: {e}")
+
+    def _redis_call(self, method: str, *args, **kwargs):
+        if self.redis_client is None or not self.redis_available:
+            return None
+        try:
+            return getattr(self.redis_client, method)(*args, **kwargs)
+        except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) as e:
+            print(f"Redis unavailable, falling back to the local dedup filter: {e}")
+            self.redis_available = False
+            return None
+
+    def is_duplicate(self, hml_id: str) -> bool:
+        if hml_id in self.pending:
+            return True
+        if self.trusted and hml_id not in self.bloom:
+            return False
+        exists = self._redis_call("exists", hml_id)
+        if exists is not None:
+            if exists:
+                # Cold runs learn the ids Redis already holds so the saved filter can be trusted
+                self.bloom.add(hml_id)
+            return bool(exists)
+        if not self.trusted:
+            raise RuntimeError("Cannot dedup HML products: Redis is unreachable and no dedup filter was loaded")
+        return True
+
+    def mark_seen(self, hml_id: str, value: str) -> None:
+        self.bloom.add(hml_id)
+        if self._redis_call("set", hml_id, value, ex=self.settings.dedup_ttl_seconds) is None:
+            self.pending[hml_id] = [int(time.time()), value]
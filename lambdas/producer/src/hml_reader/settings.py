@@ -24,6 +24,15 @@ class Settings(BaseSettings):
     aio_pika_url: str = "amqp://{}:{}@{}:{}/"
     redis_url: str = "localhost"
     redis_port: int = 6379
+    redis_socket_timeout: float = 5.0
+
+    dedup_ttl_seconds: int = 604800  # a week
+    dedup_bucket_seconds: int = 86400
+    dedup_capacity: int = 50000
+    dedup_error_rate: float = 0.01
+    dedup_s3_bucket: str | None = None
+    dedup_s3_key: str = "dedup/hml_bloom_filter.bin"
+    dedup_redis_key: str = "hml_reader:bloom_filter"
 
     flooded_data_queue: str = "hml_files"
     error_queue: str = "error_queue"
@@ -38,6 +47,8 @@ class Settings(BaseSettings):
             self.rabbitmq_default_host = os.getenv("RABBITMQ_HOST")
         if os.getenv("REDIS_HOST") is not None:
             self.redis_url = os.getenv("REDIS_HOST") 
+        if os.getenv("DEDUP_S3_BUCKET") is not None:
+            self.dedup_s3_bucket = os.getenv("DEDUP_S3_BUCKET")
 
         self.aio_pika_url = self.aio_pika_url.format(
             self.rabbitmq_default_username,
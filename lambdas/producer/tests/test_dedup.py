@@ -0,0 +1,169 @@
+import pytest
+import redis.exceptions
+
+from hml_reader.dedup import HMLDeduplicator, RotatingBloomFilter
+from hml_reader.settings import Settings
+
+DAY = 86400
+WEEK = 7 * DAY
+
+
+class FakeRedis:
+    """The slice of redis.Redis the deduplicator uses, with a switch to simulate an outage."""
+
+    def __init__(self, *keys):
+        self.data = {key: "{}" for key in keys}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise redis.exceptions.ConnectionError("Redis is down")
+
+    def exists(self, key):
+        self._check()
+        return int(key in self.data)
+
+    def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value
+        return True
+
+
+class InMemoryStore:
+    def __init__(self):
+        self.blob = None
+        self.fail_save = False
+
+    def load(self):
+        return self.blob
+
+    def save(self, blob):
+        if self.fail_save:
+            raise IOError("put_object failed")
+        self.blob = blob
+
+    def delete(self):
+        self.blob = None
+
+
+def make_filter(**kwargs):
+    params = dict(ttl_seconds=WEEK, bucket_seconds=DAY, capacity=1000, error_rate=0.01)
+    params.update(kwargs)
+    return RotatingBloomFilter(**params)
+
+
+def run(redis_client, store, listing):
+    """Mirrors producer_lambda.lambda_handler, returning the ids it would publish."""
+    dedup = HMLDeduplicator(settings=Settings(), redis_client=redis_client, store=store)
+    dedup.load()
+    published = []
+    for hml_id in listing:
+        if not dedup.is_duplicate(hml_id):
+            dedup.mark_seen(hml_id, "{}")
+            published.append(hml_id)
+    dedup.save()
+    return published
+
+
+def test_filter_round_trip():
+    bloom = make_filter()
+    bloom.add("a", now=0)
+    bloom.add("b", now=DAY)
+
+    restored = make_filter()
+    assert restored.load_bytes(bloom.to_bytes())
+    assert "a" in restored and "b" in restored
+    assert "c" not in restored
+    assert restored.buckets == bloom.buckets
+
+
+def test_filter_rejects_corrupt_blob():
+    bloom = make_filter()
+    bloom.add("a")
+    blob = bloom.to_bytes()
+
+    assert not bloom.load_bytes(b"not a filter")
+    assert not bloom.load_bytes(blob[:-4])
+    assert "a" in bloom
+
+
+def test_filter_rejects_different_geometry():
+    bloom = make_filter()
+    bloom.add("a")
+
+    assert not make_filter(capacity=2000).load_bytes(bloom.to_bytes())
+    assert not make_filter(bucket_seconds=DAY // 2).load_bytes(bloom.to_bytes())
+
+
+def test_rotate_drops_expired_buckets():
+    bloom = make_filter()
+    bloom.add("old", now=0)
+    bloom.add("new", now=3 * DAY)
+
+    bloom.rotate(now=WEEK)
+    assert "old" in bloom
+
+    bloom.rotate(now=WEEK + DAY)
+    assert "old" not in bloom
+    assert "new" in bloom
+
+
+def test_merge_bytes():
+    first, second = make_filter(), make_filter()
+    first.add("a", now=0)
+    second.add("b", now=0)
+    second.add("c", now=DAY)
+
+    assert first.merge_bytes(second.to_bytes())
+    assert all(key in first for key in ("a", "b", "c"))
+    assert not first.merge_bytes(b"not a filter")
+
+
+def test_cold_run_learns_ids_redis_already_holds():
+    redis_client = FakeRedis(*[f"old{i}" for i in range(5)])
+    store = InMemoryStore()
+    listing = [f"old{i}" for i in range(5)] + ["new1"]
+
+    assert run(redis_client, store, listing) == ["new1"]
+    assert run(redis_client, store, listing + ["new2"]) == ["new2"]
+
+
+def test_cold_filter_without_redis_raises():
+    redis_client = FakeRedis()
+    redis_client.down = True
+    dedup = HMLDeduplicator(settings=Settings(), redis_client=redis_client, store=InMemoryStore())
+    dedup.load()
+
+    with pytest.raises(RuntimeError):
+        dedup.is_duplicate("a")
+
+
+def test_failed_save_deletes_persisted_filter():
+    redis_client = FakeRedis()
+    store = InMemoryStore()
+    run(redis_client, store, ["a"])
+    assert store.blob is not None
+
+    store.fail_save = True
+    assert run(redis_client, store, ["a", "b"]) == ["b"]
+    assert store.blob is None
+
+    # The next run starts cold and confirms everything against Redis instead of trusting a stale filter
+    store.fail_save = False
+    assert run(redis_client, store, ["a", "b", "c"]) == ["c"]
+
+
+def test_ids_published_during_outage_are_not_republished():
+    redis_client = FakeRedis()
+    store = InMemoryStore()
+    assert run(redis_client, store, ["a", "b"]) == ["a", "b"]
+
+    redis_client.down = True
+    assert run(redis_client, store, ["a", "b", "c"]) == ["c"]
+    assert "c" not in redis_client.data
+
+    redis_client.down = False
+    assert run(redis_client, store, ["a", "b", "c"]) == []
+    # The id published during the outage was written back to Redis
+    assert "c" in redis_client.data
+    assert run(redis_client, store, ["a", "b", "c"]) == []
@@ -0,0 +1,32 @@
+import importlib
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+LAMBDA_PATHS = [
+    REPO_ROOT / "lambdas" / "producer",
+    REPO_ROOT / "lambdas" / "producer" / "src",
+    REPO_ROOT / "lambdas" / "autoscaler",
+    REPO_ROOT / "lambdas" / "postprocess",
+]
+
+
+def load_lambda(module_name: str):
+    """Imports a Lambda handler module straight from the lambdas/ tree.
+
+    Parameters
+    ----------
+    module_name : str
+        The handler module, e.g. ``producer_lambda``.
+
+    Returns
+    -------
+    module
+        The imported module. Modules that create boto3 clients at import time must be loaded
+        inside the moto context so those clients are mocked as well.
+    """
+    for path in LAMBDA_PATHS:
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+    return importlib.import_module(module_name)
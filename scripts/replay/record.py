@@ -0,0 +1,95 @@
+"""Records live HML listings and t-route outputs for the replay harness.
+
+Example
+-------
+python scripts/replay/record.py --out recordings/2025-04-02 --interval 300 --duration 21600 \
+    --bucket <APP_BUCKET_NAME> --troute-prefix <APP_OUTPUT_S3_KEY> --hydrofabric-prefix <HYDROFABRIC_S3_KEY>
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import boto3
+
+from _lambdas import load_lambda
+
+
+def record_listings(out_dir: Path, interval: int, duration: int) -> None:
+    """Appends one api.weather.gov HML listing per ``interval`` seconds to listings.jsonl.
+
+    Each line is ``{"recorded_at": <iso>, "products": [...]}`` where the products are exactly
+    what ``producer_lambda.fetch_weather_products`` returned, so replay feeds the producer the
+    same input it saw live.
+    """
+    producer_lambda = load_lambda("producer_lambda")
+    deadline = time.monotonic() + duration
+    with open(out_dir / "listings.jsonl", "a") as f:
+        while True:
+            recorded_at = datetime.now(timezone.utc)
+            try:
+                products = producer_lambda.fetch_weather_products()
+            except Exception as e:
+                print(f"Skipping listing at {recorded_at.isoformat()}: {e}")
+            else:
+                f.write(json.dumps({"recorded_at": recorded_at.isoformat(), "products": products}) + "\n")
+                f.flush()
+                print(f"Recorded {len(products)} HML products at {recorded_at.isoformat()}")
+            if time.monotonic() + interval > deadline:
+                break
+            time.sleep(interval)
+
+
+def record_troute_outputs(out_dir: Path, bucket: str, prefix: str, limit: int) -> None:
+    """Downloads the most recent t-route outputs so replayed workers can emit real files."""
+    s3_client = boto3.client("s3")
+    troute_dir = out_dir / "troute"
+    troute_dir.mkdir(exist_ok=True)
+
+    objects = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        objects.extend(obj for obj in page.get("Contents", []) if obj["Key"].endswith(".nc"))
+    objects = sorted(objects, key=lambda obj: obj["LastModified"], reverse=True)[:limit]
+
+    with open(out_dir / "troute.jsonl", "w") as f:
+        for obj in objects:
+            filename = Path(obj["Key"]).name
+            s3_client.download_file(Bucket=bucket, Key=obj["Key"], Filename=str(troute_dir / filename))
+            f.write(json.dumps({
+                "key": obj["Key"],
+                "filename": filename,
+                "last_modified": obj["LastModified"].isoformat(),
+                "size": obj["Size"],
+            }) + "\n")
+    print(f"Recorded {len(objects)} t-route outputs from s3://{bucket}/{prefix}")
+
+
+def record_hydrofabric(out_dir: Path, bucket: str, prefix: str) -> None:
+    s3_client = boto3.client("s3")
+    s3_client.download_file(Bucket=bucket, Key=f"{prefix}/flowpaths.parquet", Filename=str(out_dir / "flowpaths.parquet"))
+    print(f"Recorded s3://{bucket}/{prefix}/flowpaths.parquet")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, required=True, help="Directory the recording is written to")
+    parser.add_argument("--interval", type=int, default=300, help="Seconds between HML listings (default matches the producer schedule)")
+    parser.add_argument("--duration", type=int, default=0, help="Seconds to keep recording listings, 0 records a single listing")
+    parser.add_argument("--bucket", help="App bucket holding t-route outputs and the hydrofabric")
+    parser.add_argument("--troute-prefix", help="APP_OUTPUT_S3_KEY of the t-route outputs to record")
+    parser.add_argument("--troute-limit", type=int, default=20, help="Number of most recent t-route outputs to download")
+    parser.add_argument("--hydrofabric-prefix", help="HYDROFABRIC_S3_KEY holding flowpaths.parquet")
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    if args.bucket and args.troute_prefix:
+        record_troute_outputs(args.out, args.bucket, args.troute_prefix, args.troute_limit)
+    if args.bucket and args.hydrofabric_prefix:
+        record_hydrofabric(args.out, args.bucket, args.hydrofabric_prefix)
+    record_listings(args.out, args.interval, args.duration)
+
+
+if __name__ == "__main__":
+    main()
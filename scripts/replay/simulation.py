@@ -0,0 +1,227 @@
+"""Worker fleet, scaling policy and reporting models for the replay harness.
+
+Nothing in here talks to AWS; ``replay.py`` feeds these models from the stand-in services.
+"""
+import csv
+import json
+import math
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class StepScalingPolicy:
+    """Emulates the BacklogPerTask alarms and step scaling policies in terraform/modules/app.
+
+    The defaults mirror the deployed alarms: both evaluate two 60 second periods against a
+    threshold of 100, scale out by one task with a 60 second cooldown and scale in by one task
+    with a 120 second cooldown.
+    """
+    min_count: int = 1
+    max_count: int = 6
+    threshold: float = 100.0
+    period: int = 60
+    evaluation_periods: int = 2
+    scale_up_cooldown: int = 60
+    scale_down_cooldown: int = 120
+    last_scaled_at: Optional[datetime] = None
+    last_adjustment: int = 0
+
+    def evaluate(self, datapoints: List[float], desired: int, now: datetime) -> int:
+        """Returns the new desired count given the BacklogPerTask datapoints in the alarm window.
+
+        As with CloudWatch's default missing-data handling, the alarm only uses the datapoints
+        it has and does nothing when the window is empty.
+        """
+        if not datapoints:
+            return desired
+        if all(value >= self.threshold for value in datapoints):
+            adjustment, cooldown = 1, self.scale_up_cooldown
+        elif all(value < self.threshold for value in datapoints):
+            adjustment, cooldown = -1, self.scale_down_cooldown
+        else:
+            return desired
+
+        if self.last_scaled_at is not None and now < self.last_scaled_at + timedelta(seconds=cooldown):
+            return desired
+        new_desired = min(self.max_count, max(self.min_count, desired + adjustment))
+        if new_desired != desired:
+            self.last_scaled_at = now
+            self.last_adjustment = adjustment
+        return new_desired
+
+    @property
+    def window(self) -> timedelta:
+        return timedelta(seconds=self.period * self.evaluation_periods)
+
+
+@dataclass
+class Task:
+    task_id: int
+    ready_at: datetime
+    busy_until: Optional[datetime] = None
+    hml_id: Optional[str] = None
+    stopping: bool = False
+
+
+@dataclass
+class WorkerFleet:
+    """Simulated Fargate workers consuming one message at a time.
+
+    Parameters
+    ----------
+    service_time : float
+        Mean seconds a worker spends on one HML message.
+
+    service_jitter : float
+        Service times are drawn uniformly from ``service_time * (1 ± service_jitter)``.
+
+    startup_delay : float
+        Seconds between a scale-out and the new task consuming messages.
+    """
+    service_time: float
+    service_jitter: float = 0.0
+    startup_delay: float = 60.0
+    seed: Optional[int] = None
+    tasks: List[Task] = field(default_factory=list)
+    next_task_id: int = 0
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    @property
+    def desired(self) -> int:
+        return sum(1 for task in self.tasks if not task.stopping)
+
+    def running(self, now: datetime) -> List[Task]:
+        return [task for task in self.tasks if task.ready_at <= now]
+
+    def busy(self) -> List[Task]:
+        return [task for task in self.tasks if task.busy_until is not None]
+
+    def scale_to(self, desired: int, now: datetime) -> List[Task]:
+        """Starts or stops tasks to reach ``desired``, returning any newly started tasks.
+
+        Idle tasks are stopped first. Busy tasks asked to stop finish their current message,
+        which approximates ECS waiting out the stop timeout before killing the container.
+        """
+        started = []
+        while self.desired < desired:
+            task = Task(task_id=self.next_task_id, ready_at=now + timedelta(seconds=self.startup_delay))
+            self.next_task_id += 1
+            self.tasks.append(task)
+            started.append(task)
+        surplus = self.desired - desired
+        for task in sorted(self.tasks, key=lambda task: task.busy_until is not None):
+            if surplus <= 0:
+                break
+            if not task.stopping:
+                task.stopping = True
+                surplus -= 1
+        self.tasks = [task for task in self.tasks if not (task.stopping and task.busy_until is None)]
+        return started
+
+    def idle(self, now: datetime) -> List[Task]:
+        return [
+            task for task in self.tasks
+            if task.ready_at <= now and task.busy_until is None and not task.stopping
+        ]
+
+    def start(self, task: Task, hml_id: str, now: datetime) -> datetime:
+        jitter = self.rng.uniform(-self.service_jitter, self.service_jitter)
+        task.busy_until = now + timedelta(seconds=max(0.0, self.service_time * (1 + jitter)))
+        task.hml_id = hml_id
+        return task.busy_until
+
+    def finish(self, task: Task) -> None:
+        task.busy_until = None
+        task.hml_id = None
+        if task.stopping:
+            self.tasks.remove(task)
+
+
+@dataclass
+class MessageTrace:
+    hml_id: str
+    issued_at: datetime
+    published_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    postprocessed_at: Optional[datetime] = None
+    output_key: Optional[str] = None
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p90/p99 and max, or None for each when there are no values."""
+    if not values:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {"count": len(ordered), "p50": rank(50), "p90": rank(90), "p99": rank(99), "max": ordered[-1]}
+
+
+@dataclass
+class ReplayReport:
+    traces: Dict[str, MessageTrace] = field(default_factory=dict)
+    timeline: List[Dict[str, object]] = field(default_factory=list)
+    scaling_events: List[Tuple[str, int, int]] = field(default_factory=list)
+    postprocess_runs: List[Tuple[str, str]] = field(default_factory=list)
+    autoscaler_failures: List[Tuple[str, str]] = field(default_factory=list)
+
+    def _latencies(self, start: str, end: str) -> List[float]:
+        return [
+            (getattr(trace, end) - getattr(trace, start)).total_seconds()
+            for trace in self.traces.values()
+            if getattr(trace, start) is not None and getattr(trace, end) is not None
+        ]
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "messages": {
+                "published": sum(1 for trace in self.traces.values() if trace.published_at),
+                "completed": sum(1 for trace in self.traces.values() if trace.completed_at),
+                "postprocessed": sum(1 for trace in self.traces.values() if trace.postprocessed_at),
+            },
+            "latency_seconds": {
+                "issuance_to_publish": percentiles(self._latencies("issued_at", "published_at")),
+                "queue_wait": percentiles(self._latencies("published_at", "started_at")),
+                "issuance_to_worker_done": percentiles(self._latencies("issued_at", "completed_at")),
+                "issuance_to_postprocess": percentiles(self._latencies("issued_at", "postprocessed_at")),
+            },
+            "peak_queue_depth": max((row["queue_depth"] for row in self.timeline), default=0),
+            "peak_running_tasks": max((row["running_tasks"] for row in self.timeline), default=0),
+            "scaling_events": [
+                {"time": time, "from": before, "to": after} for time, before, after in self.scaling_events
+            ],
+            "postprocess_runs": [{"time": time, "status": status} for time, status in self.postprocess_runs],
+            "autoscaler_failures": [{"time": time, "body": body} for time, body in self.autoscaler_failures],
+        }
+
+    def write(self, out_dir: Path) -> Dict[str, object]:
+        """Writes report.json, timeline.csv (queue-depth curve) and messages.csv to ``out_dir``."""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        summary = self.summary()
+        with open(out_dir / "report.json", "w") as f:
+            json.dump(summary, f, indent=2)
+
+        if self.timeline:
+            with open(out_dir / "timeline.csv", "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(self.timeline[0]))
+                writer.writeheader()
+                writer.writerows(self.timeline)
+
+        with open(out_dir / "messages.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(MessageTrace.__dataclass_fields__))
+            writer.writeheader()
+            for trace in sorted(self.traces.values(), key=lambda trace: trace.issued_at):
+                writer.writerow({
+                    key: value.isoformat() if isinstance(value, datetime) else value
+                    for key, value in asdict(trace).items()
+                })
+        return summary
@@ -131,6 +131,9 @@ resource "aws_lambda_function" "producer" {
   runtime = "python3.12"
   timeout = 300
 
+  # Overlapping runs would race on the persisted dedup filter, so runs are serialized
+  reserved_concurrent_executions = 1
+
   vpc_config {
     subnet_ids         = var.networking.private_subnet_ids
     security_group_ids = var.networking.lambda_security_group_ids
@@ -141,6 +144,7 @@ resource "aws_lambda_function" "producer" {
       RABBITMQ_ENDPOINT   = var.service_dependencies.rabbitmq_endpoint
       RABBITMQ_SECRET_ARN = var.service_dependencies.rabbitmq_secret_arn
       REDIS_HOST          = var.service_dependencies.elasticache_endpoint
+      DEDUP_S3_BUCKET     = var.service_dependencies.app_bucket_name
     }
   }
 
@@ -185,6 +185,38 @@ resource "aws_iam_role_policy_attachment" "lambda_producer_read_secret" {
   policy_arn = aws_iam_policy.read_rabbitmq_secret.arn
 }
 
+resource "aws_iam_policy" "lambda_producer_dedup_policy" {
+  name        = "${var.app_name}-${var.environment}-lambda-producer-dedup-policy"
+  description = "Policy for the Producer Lambda to persist its HML dedup filter in the app S3 bucket."
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        # Without ListBucket a missing filter is reported as AccessDenied instead of NoSuchKey
+        Sid      = "AllowBucketListing",
+        Effect   = "Allow",
+        Action   = "s3:ListBucket",
+        Resource = "arn:aws:s3:::${var.app_bucket_name}"
+      },
+      {
+        Sid      = "AllowDedupObjectActions",
+        Effect   = "Allow",
+        Action   = [
+            "s3:GetObject",
+            "s3:PutObject",
+            "s3:DeleteObject"
+        ],
+        Resource = "arn:aws:s3:::${var.app_bucket_name}/dedup/*"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_producer_dedup_s3_access" {
+  role       = aws_iam_role.lambda_producer_role.name
+  policy_arn = aws_iam_policy.lambda_producer_dedup_policy.arn
+}
+
 # -----------------------------------------------------------------------------
 # Post-Processing Lambda Role
 # Needs permission to write logs to CloudWatch.